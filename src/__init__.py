@@ -1,15 +1,25 @@
 import pygame
 import random
+import numpy as np
 from pygame import Vector2
 
 from src.util import circle_collide_rect, draw_hp
 from src.util import draw_circle
+from src.util import spiral_positions
+from src.util import faction_colors
 
 from .unit import Unit
 from .unit import Infantry
-from .gui import GUI
-
-pygame.init()
+from .unit import separation_strength
+from .formation import Formation
+from .spatial import SpatialIndex
+from .render import UnitRenderer
+from .timestep import FixedTimestep
+from .projectile import ProjectilePool
+from .obstacle import DistanceField
+from .influence import InfluenceMap
+from .telemetry import Telemetry
+from .command import CommandQueue
 
 
 class Options:
@@ -22,17 +32,29 @@ class Options:
 
 
 class Game:
-    def __init__(self) -> None:
+    kernel_modes = (None, 'numba', 'auto')
+
+    def __init__(self, headless: bool = False, telemetry_path: str = None,
+                 kernels: str = None) -> None:
+        if kernels not in self.kernel_modes:
+            raise ValueError(f'unknown kernel backend: {kernels}')
         self.scale = 3
         self.screen_size = Vector2(240, 240)
         self.scr = pygame.Surface(self.screen_size)
-        self.win = pygame.display.set_mode(
-            list(map(int, self.screen_size*self.scale)))
-        pygame.display.set_caption('micro capture')
+        self.headless = headless
+        self.win = None
+        if not headless:
+            # only the subsystems a window needs, audio is never started
+            pygame.display.init()
+            pygame.font.init()
+            self.win = pygame.display.set_mode(
+                list(map(int, self.screen_size*self.scale)))
+            pygame.display.set_caption('micro capture')
         self.clock = pygame.time.Clock()
 
         self.selection = None
         self.select_start = None
+        self.selection_moved = False
 
         self.units = []
 
@@ -40,69 +62,191 @@ class Game:
 
         self.options = Options()
 
-        self.grid = Grid(self.screen_size, self.screen_size//8)
+        self.grid = SpatialIndex(
+            self.screen_size, [self.screen_size//60, self.screen_size//8])
 
         self.buildings = []
+        self.obstacles = DistanceField(self.screen_size)
+
+        self.telemetry = Telemetry(telemetry_path, factions=len(faction_colors))
+
+        self.influence = InfluenceMap(
+            self.screen_size, self.grid.levels[-1].cell_size,
+            factions=len(faction_colors))
+
+        self.projectiles = ProjectilePool()
+
+        self.formation = Formation('box', bounds=self.screen_size)
 
-        self.gui = GUI(self)
+        self.commands = CommandQueue()
+
+        self.renderer = UnitRenderer()
+
+        self.timestep = FixedTimestep(rate=60, policy='skip')
+
+        # None keeps the per-unit methods and never imports numba, 'numba'
+        # requires the JIT kernels and 'auto' uses them when installed; the
+        # reference kernels are slower than the per-unit methods and only
+        # exist for parity checks
+        self.kernels = None
+        if kernels is not None:
+            # imported here so `python -m src.kernels` doesn't find the
+            # module already loaded by the package
+            from .kernels import load_numba
+            self.kernels = load_numba()
+            if self.kernels is None and kernels == 'numba':
+                raise RuntimeError('numba is not installed')
+
+        self.gui = None
+        if not headless:
+            # pygame_gui is slow to import and only needed with a window
+            from .gui import GUI
+            self.gui = GUI(self)
 
     def run(self) -> None:
         while 1:
             dt = self.clock.tick(60)*.001
-            self.update(dt)
-            self.draw()
+            self.process_input(dt)
+            for _ in range(self.timestep.advance(dt)):
+                self.update(self.timestep.step)
+            self.draw(self.timestep.alpha)
 
-    def update(self, dt: float) -> None:
+    def process_input(self, dt: float) -> None:
         for event in pygame.event.get():
             self.gui.process_events(event)
             self.process_events(event)
 
+        # held keys and the drag selection are handled once per frame, not
+        # once per event
+        self.process_held_keys()
+        if self.selection_moved:
+            self.update_selection(Vector2(pygame.mouse.get_pos())/self.scale)
+
         self.gui.update(dt)
 
+    def update(self, dt: float) -> None:
+        self.telemetry.tick(dt)
+        self.commands.apply(self)
+
         self.grid.clear()
         self.grid.add_all(self.units)
 
+        if self.kernels is not None:
+            self.apply_kernels()
+
         for unit in self.units:
-            unit.separation(self.grid.query_circle(
-                unit.pos, unit.size + unit.size/2))
-            unit.find_target(self.grid.query_circle(
-                unit.pos, unit.weapon.range))
-            unit.update(dt)
+            if self.kernels is None:
+                unit.separation(self.grid.query_circle(
+                    unit.pos, unit.size + unit.size/2))
+                unit.find_target(self.grid.query_circle(
+                    unit.pos, unit.weapon.range))
+            unit.update(dt, steer=self.kernels is None)
             unit.restrict_to_surface(self.scr)
 
+        self.obstacles.resolve(self.units)
+
+        self.projectiles.update(dt, self.grid)
+
         [building.update(dt) for building in self.buildings]
+        [self.telemetry.removed(unit) for unit in self.units if not unit.alive]
         self.units = [unit for unit in self.units if unit.alive]
         self.selected_units = [unit for unit in self.selected_units
                                if unit.alive]
 
+        self.influence.update(self.units, dt)
+
+    def apply_kernels(self) -> None:
+        from .kernels import cell_list
+        if not self.units:
+            return
+        count = len(self.units)
+        pos = np.array([(unit.pos.x, unit.pos.y) for unit in self.units])
+        size = np.array([unit.size for unit in self.units], dtype=np.float64)
+        reach = np.array([unit.weapon.range for unit in self.units],
+                         dtype=np.float64)
+        faction = np.array([unit.faction for unit in self.units])
+
+        # the kernels bucket units on the same cells as the index levels
+        fine = self.grid.levels[0].cell_size.x
+        coarse = self.grid.levels[-1].cell_size.x
+
+        forces = np.zeros((count, 2))
+        self.kernels.separation(
+            pos, size, *cell_list(pos, fine, self.screen_size),
+            separation_strength, forces)
+
+        enemies = np.zeros(count, dtype=np.int64)
+        self.kernels.nearest_enemy(
+            pos, faction, reach, *cell_list(pos, coarse, self.screen_size),
+            enemies)
+
+        for unit, force, enemy in zip(self.units, forces.tolist(), enemies.tolist()):
+            unit.acc += Vector2(force)
+            unit.attack_target = self.units[enemy] if enemy >= 0 else None
+
+        moving = [i for i, unit in enumerate(self.units) if unit.arrive()]
+        if not moving:
+            return
+        movers = [self.units[i] for i in moving]
+        vel = np.array([(unit.vel.x, unit.vel.y) for unit in movers])
+        target = np.array([(unit.move_target.x, unit.move_target.y)
+                           for unit in movers])
+        max_speed = np.array([unit.max_speed for unit in movers],
+                             dtype=np.float64)
+        steering = np.zeros((len(movers), 2))
+        self.kernels.seek(pos[moving], vel, target, max_speed,
+                          np.zeros(len(movers)), steering)
+        for unit, force in zip(movers, steering.tolist()):
+            unit.acc += Vector2(force)
+
+    def add_building(self, building) -> None:
+        building.game = self
+        self.buildings.append(building)
+        self.obstacles.add(building)
+
+    def remove_building(self, building) -> None:
+        self.buildings.remove(building)
+        self.obstacles.remove(building)
+
+    def spawn(self, unit_type: type, count: int, pos: Vector2, faction: int,
+              target: Vector2 = None, spacing: float = 4) -> list:
+        units = [unit_type(p, faction=faction)
+                 for p in spiral_positions(pos, count, spacing)]
+        for unit in units:
+            unit.telemetry = self.telemetry
+            unit.weapon.projectiles = self.projectiles
+        self.units.extend(units)
+        self.grid.add_all(units)
+        if target is not None:
+            [unit.set_move_target(slot)
+             for unit, slot in self.formation.assign(units, target)]
+        return units
+
     def process_events(self, event) -> None:
         if (event.type == pygame.QUIT or
             (event.type == pygame.KEYDOWN and
                 event.key == pygame.K_ESCAPE)):
+            self.telemetry.close()
             pygame.quit()
             exit()
-        self.process_key_events(event)
         self.process_mouse_events(event)
 
-    def process_key_events(self, event) -> None:
-        # if event.type == pygame.KEYDOWN:
-        #     pass
-
+    def process_held_keys(self) -> None:
         keys = pygame.key.get_pressed()
         rpos = Vector2(random.random()-0.5, random.random()-0.5)
         if keys[pygame.K_1]:
             pos = Vector2(60, 60) + rpos
-            self.units.append(Infantry(pos, faction=0))
+            self.commands.spawn(pygame.K_1, Infantry, pos, faction=0)
         if keys[pygame.K_2]:
             pos = Vector2(self.screen_size.x - 60, 60) + rpos
-            self.units.append(Infantry(pos, faction=1))
+            self.commands.spawn(pygame.K_2, Infantry, pos, faction=1)
         if keys[pygame.K_3]:
             pos = Vector2(self.screen_size.x - 60,
                           self.screen_size.y - 60) + rpos
-            self.units.append(Infantry(pos, faction=2))
+            self.commands.spawn(pygame.K_3, Infantry, pos, faction=2)
         if keys[pygame.K_4]:
             pos = Vector2(60, self.screen_size.y - 60) + rpos
-            self.units.append(Infantry(pos, faction=3))
+            self.commands.spawn(pygame.K_4, Infantry, pos, faction=3)
 
     def process_mouse_events(self, event) -> None:
         mpos = Vector2(pygame.mouse.get_pos())/self.scale
@@ -117,6 +261,8 @@ class Game:
 
         elif event.type == pygame.MOUSEBUTTONUP:
             if event.button == 1:
+                if self.selection_moved:
+                    self.update_selection(mpos)
                 dist = self.select_start.distance_to(mpos)
                 unit = self.get_unit_at(mpos)
                 if dist <= 1 and unit:
@@ -125,20 +271,22 @@ class Game:
                 self.selection = None
             elif event.button == 3:
                 if self.selected_units:
-                    if pygame.key.get_mods() & pygame.KMOD_SHIFT:
-                        [unit.add_move_target(mpos)
-                         for unit in self.selected_units]
-                    else:
-                        [unit.set_move_target(mpos)
-                         for unit in self.selected_units]
+                    self.commands.move(
+                        self.selected_units, mpos,
+                        queued=bool(pygame.key.get_mods() & pygame.KMOD_SHIFT))
 
         elif event.type == pygame.MOUSEMOTION:
             if self.select_start and not self.selection:
                 self.selection = Selection(self.select_start)
             if self.selection:
-                self.selection.update(mpos)
-                self.selected_units = self.get_units_in_rect(
-                    self.selection.rect)
+                self.selection_moved = True
+
+    def update_selection(self, mpos: Vector2) -> None:
+        self.selection_moved = False
+        if self.selection:
+            self.selection.update(mpos)
+            self.selected_units = self.get_units_in_rect(
+                self.selection.rect)
 
     def get_unit_at(self, pos: Vector2) -> Unit:
         for unit in self.units:
@@ -147,26 +295,30 @@ class Game:
         return None
 
     def get_units_in_rect(self, rect: pygame.Rect) -> list:
-        return [unit for unit in self.units if rect.collidepoint(unit.pos)]
+        # the index was filled at the start of the last tick, dead units may
+        # still be in it
+        return [unit for unit in self.grid.query_rect(rect, margin=2)
+                if unit.alive]
 
-    def draw(self) -> None:
+    def draw(self, alpha: float = 1) -> None:
         self.scr.fill((40, 30, 40))
 
         # self.grid.draw(self.scr)
 
-        # draw the unit targets
-        [draw_circle(self.scr, (0, 200, 0, 100), unit.move_target, 2, 1)
-            for unit in self.selected_units if unit.move_target]
+        # draw the unit targets and queued waypoints, these are fixed points
+        # so they are not interpolated
+        [draw_circle(self.scr, (0, 200, 0, 100), target, 2, 1)
+            for unit in self.selected_units if unit.move_target
+            for target in (unit.move_target, *unit.waypoints)]
 
         # draw the unit trails
         # [t.draw(self.scr) for u in self.units for t in u.trails]
 
-        # draw the selection rings
-        [draw_circle(self.scr, (0, 200, 0, 100), unit.pos, unit.size+2, 1)
-            for unit in self.selected_units]
+        # draw the units and their selection rings in one batch
+        self.renderer.draw(self.scr, self.units, self.selected_units, alpha)
 
-        # draw the units
-        [unit.draw(self.scr) for unit in self.units]
+        # draw the projectiles
+        self.projectiles.draw(self.scr, alpha)
 
         # draw the buildings
         [building.draw(self.scr) for building in self.buildings]
@@ -176,13 +328,13 @@ class Game:
             for unit in self.units:
                 draw_circle(
                     self.scr, (0, 0, 100, 10),
-                    unit.pos,
+                    unit.draw_pos(alpha),
                     unit.weapon.range, 1)
 
         # draw the hp bars
         if self.options.show_health:
             [draw_hp(surface=self.scr,
-                     pos=Vector2(unit.pos.x, unit.pos.y - 4),
+                     pos=unit.draw_pos(alpha) - Vector2(0, 4),
                      size=Vector2(8, 3),
                      pct=unit.health/unit.max_health)
              for unit in self.units]
@@ -211,47 +363,3 @@ class Selection:
         if new_pos.y < pos.y:
             pos.y = new_pos.y
         self.rect = pygame.Rect(pos, size)
-
-
-class Grid:
-    def __init__(self, size: Vector2, cell_size: Vector2):
-        self.size = size
-        self.cell_size = cell_size
-        self.cells = {}
-        self.clear()
-
-    def clear(self):
-        self.cells = {}
-        for x in range(int(self.size.x // self.cell_size.x)):
-            for y in range(int(self.size.y // self.cell_size.y)):
-                self.cells[(x, y)] = []
-
-    def to_key(self, pos: Vector2):
-        return (int(pos.x//self.cell_size.x), int(pos.y//self.cell_size.y))
-
-    def add(self, obj: object):
-        key = self.to_key(obj.pos)
-        self.cells.setdefault(key, []).append(obj)
-
-    def add_all(self, objs: list):
-        for obj in objs:
-            self.add(obj)
-
-    def query_circle(self, pos: Vector2, radius: float) -> list:
-        objs = []
-        start_x = int((pos.x - radius)//self.cell_size.x)
-        start_y = int((pos.y - radius)//self.cell_size.y)
-        end_x = int((pos.x + radius)//self.cell_size.x)
-        end_y = int((pos.y + radius)//self.cell_size.y)
-        for x in range(start_x, end_x+1):
-            for y in range(start_y, end_y+1):
-                objs.extend(self.cells.get((x, y), []))
-        return objs
-
-    # draw each cell as a rectangle
-    def draw(self, surf: pygame.Surface):
-        for x in range(int(self.size.x//self.cell_size.x)):
-            for y in range(int(self.size.y//self.cell_size.y)):
-                pygame.draw.rect(surf, (0, 0, 0, 10),
-                                 (x*self.cell_size.x, y*self.cell_size.y,
-                                  self.cell_size.x, self.cell_size.y), 1)
@@ -1,3 +1,3 @@
 from src import Game
 
-Game().run()
+Game(kernels='auto').run()
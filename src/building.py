@@ -1,16 +1,56 @@
+from collections import deque
+
 import pygame
 from pygame import Vector2
 
+from src.util import spiral_radius
+
+
+class ProductionOrder:
+    def __init__(self, unit_type: type, count: int, build_time: float) -> None:
+        self.unit_type = unit_type
+        self.count = count
+        self.build_time = build_time
+
 
 class Building:
-    def __init__(self, pos: Vector2, size: int = 10) -> None:
+    def __init__(self, pos: Vector2, size: int = 10, faction: int = 0,
+                 game=None) -> None:
         self.pos = Vector2(pos)
         self.size = size
         self.spawn_point = self.pos + Vector2(size//2, size)
         self.waypoint = self.spawn_point + Vector2(0, 10)
+        self.spawn_spacing = 4
+
+        self.faction = faction
+        self.game = game
+
+        self.production = deque()
+        self.progress = 0
+
+    def queue(self, unit_type: type, count: int = 1, build_time: float = 1) -> None:
+        self.production.append(ProductionOrder(unit_type, count, build_time))
 
     def update(self, dt: float) -> None:
-        pass
+        # without a game there is nowhere to spawn, keep the queue intact
+        if self.game is None:
+            return
+        self.progress += dt
+        # a long frame may finish several orders, leftover time carries over
+        while self.production and self.progress >= self.production[0].build_time:
+            order = self.production.popleft()
+            self.progress -= order.build_time
+            self.game.spawn(order.unit_type, order.count,
+                            self.spawn_center(order.count), self.faction,
+                            target=self.waypoint, spacing=self.spawn_spacing)
+        if not self.production:
+            self.progress = 0
+
+    def spawn_center(self, count: int) -> Vector2:
+        # a batch spirals out around its centre, keep the whole spiral below
+        # the footprint instead of centring it on the edge
+        radius = spiral_radius(count, self.spawn_spacing)
+        return self.spawn_point + Vector2(0, radius + 1)
 
     def draw(self, surf):
         pygame.draw.rect(surf, (200, 0, 0), (self.pos, (self.size, self.size)))
@@ -0,0 +1,51 @@
+from typing import List
+
+from pygame import Vector2
+
+
+class MoveOrder:
+    def __init__(self, units: list, target: Vector2, queued: bool) -> None:
+        self.units = units
+        # a queued order only adds waypoints, otherwise the first target
+        # replaces whatever the units were doing
+        self.queued = queued
+        self.targets: List[Vector2] = [Vector2(target)]
+
+
+class CommandQueue:
+    def __init__(self) -> None:
+        self.spawns = {}
+        self.moves = {}
+
+    def __len__(self) -> int:
+        return len(self.spawns) + len(self.moves)
+
+    def spawn(self, key, unit_type: type, pos: Vector2, faction: int,
+              count: int = 1) -> None:
+        # one batch per key until the queue is applied, repeats collapse
+        if key in self.spawns:
+            return
+        self.spawns[key] = (unit_type, count, Vector2(pos), faction)
+
+    def move(self, units: list, target: Vector2, queued: bool = False) -> None:
+        key = tuple(id(unit) for unit in units)
+        order = self.moves.get(key)
+        if order is None or not queued:
+            # a newer plain order for the same selection supersedes the old
+            self.moves[key] = MoveOrder(list(units), target, queued)
+        elif order.targets[-1] != target:
+            order.targets.append(Vector2(target))
+
+    def apply(self, game) -> None:
+        for unit_type, count, pos, faction in self.spawns.values():
+            game.spawn(unit_type, count, pos, faction)
+        for order in self.moves.values():
+            units = [unit for unit in order.units if unit.alive]
+            for i, target in enumerate(order.targets):
+                slots = game.formation.assign(units, target)
+                if i == 0 and not order.queued:
+                    [unit.set_move_target(slot) for unit, slot in slots]
+                else:
+                    [unit.add_move_target(slot) for unit, slot in slots]
+        self.spawns = {}
+        self.moves = {}
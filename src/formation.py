@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import math
+from typing import List, Tuple
+
+from pygame import Vector2
+
+
+class Formation:
+    shapes = ('line', 'box', 'wedge')
+
+    def __init__(self, shape: str = 'box', spacing: float = None,
+                 bounds: Vector2 = None, margin: float = 4) -> None:
+        if shape not in self.shapes:
+            raise ValueError(f'unknown formation shape: {shape}')
+        self.shape = shape
+        # when None the spacing is derived from the largest unit in the group
+        self.spacing = spacing
+        self.bounds = bounds
+        self.margin = margin
+
+    def row_sizes(self, count: int) -> List[int]:
+        if count <= 0:
+            return []
+        if self.shape == 'wedge':
+            rows = []
+            while count > 0:
+                rows.append(min(len(rows) + 1, count))
+                count -= rows[-1]
+            return rows
+        if self.shape == 'line':
+            # roughly four times as wide as it is deep
+            cols = math.ceil(math.sqrt(count * 4))
+        else:
+            cols = math.ceil(math.sqrt(count))
+        full, rest = divmod(count, cols)
+        return [cols] * full + ([rest] if rest else [])
+
+    def slots(self, count: int, target: Vector2, facing: Vector2,
+              spacing: float) -> List[List[Vector2]]:
+        lateral = Vector2(-facing.y, facing.x)
+        sizes = self.row_sizes(count)
+        # centre the formation on the target, front row first
+        depth = (len(sizes) - 1) * spacing / 2
+        rows = []
+        for i, size in enumerate(sizes):
+            back = facing * (depth - i * spacing)
+            width = (size - 1) * spacing / 2
+            rows.append([target + back + lateral * (j * spacing - width)
+                         for j in range(size)])
+        return self.fit(rows)
+
+    def fit(self, rows: List[List[Vector2]]) -> List[List[Vector2]]:
+        # move the whole formation inside the bounds, clamping single slots
+        # would stack every slot past the edge onto the same point
+        if self.bounds is None:
+            return rows
+        slots = [slot for row in rows for slot in row]
+        shift = Vector2()
+        for axis in (0, 1):
+            low = min(slot[axis] for slot in slots)
+            high = max(slot[axis] for slot in slots)
+            lower, upper = self.margin, self.bounds[axis] - self.margin
+            if high - low > upper - lower:
+                # too big to fit, centre it and let clamp squeeze the rest
+                shift[axis] = (lower + upper) / 2 - (low + high) / 2
+            elif low < lower:
+                shift[axis] = lower - low
+            elif high > upper:
+                shift[axis] = upper - high
+        return [[self.clamp(slot + shift) for slot in row] for row in rows]
+
+    def clamp(self, pos: Vector2) -> Vector2:
+        return Vector2(
+            min(max(pos.x, self.margin), self.bounds.x - self.margin),
+            min(max(pos.y, self.margin), self.bounds.y - self.margin))
+
+    def assign(self, units: list, target: Vector2) -> List[Tuple[object, Vector2]]:
+        if not units:
+            return []
+        target = Vector2(target)
+        centroid = sum((unit.pos for unit in units), Vector2()) / len(units)
+        facing = target - centroid
+        if facing.length_squared() == 0:
+            facing = Vector2(0, -1)
+        else:
+            facing.normalize_ip()
+        lateral = Vector2(-facing.y, facing.x)
+        spacing = self.spacing or max(unit.size for unit in units) * 2
+
+        # near-optimal matching without crossings: the units furthest along
+        # the travel direction take the front row, and within a row units
+        # and slots are paired in lateral order
+        ordered = sorted(units, key=lambda unit: -unit.pos.dot(facing))
+        assigned = []
+        start = 0
+        for row in self.slots(len(units), target, facing, spacing):
+            group = ordered[start:start + len(row)]
+            start += len(row)
+            group.sort(key=lambda unit: unit.pos.dot(lateral))
+            assigned.extend(zip(group, row))
+        return assigned
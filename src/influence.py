@@ -0,0 +1,105 @@
+from typing import Tuple
+
+import numpy as np
+from pygame import Vector2
+
+
+class InfluenceMap:
+    def __init__(self, size: Vector2, cell_size: Vector2, factions: int,
+                 spread: int = 2, falloff: float = 0.5,
+                 memory: float = 0.5, interval: float = 0.25) -> None:
+        self.cell_size = Vector2(cell_size)
+        self.shape = (int(size.x // cell_size.x), int(size.y // cell_size.y))
+        self.factions = factions
+        # threat leaks `spread` cells out from its source, losing `falloff`
+        # per cell, and remembered threat fades by `memory` per propagation
+        self.spread = spread
+        self.falloff = falloff
+        self.memory = memory
+        # the maps are rebuilt every `interval` seconds of game time, so
+        # their cost doesn't grow with the tick rate; the first update
+        # always rebuilds
+        self.interval = interval
+        self.elapsed = interval
+
+        shape = (factions,) + self.shape
+        self.strength = np.zeros(shape, dtype=np.float64)
+        self.dps = np.zeros(shape, dtype=np.float64)
+        self.threat = np.zeros(shape, dtype=np.float64)
+
+    def to_cell(self, pos: Vector2) -> Tuple[int, int]:
+        return (min(max(int(pos.x // self.cell_size.x), 0), self.shape[0] - 1),
+                min(max(int(pos.y // self.cell_size.y), 0), self.shape[1] - 1))
+
+    def update(self, units: list, dt: float) -> bool:
+        # returns whether the maps were rebuilt this call
+        self.elapsed += dt
+        if self.elapsed < self.interval:
+            return False
+        self.elapsed = 0
+        pos = np.array([(unit.pos.x, unit.pos.y) for unit in units],
+                       dtype=np.float64).reshape(-1, 2)
+        faction = np.array([unit.faction for unit in units], dtype=np.int64)
+        health = np.array([max(unit.health, 0) for unit in units],
+                          dtype=np.float64)
+        dps = np.array([unit.weapon.damage / unit.weapon.cooldown
+                        if unit.weapon else 0 for unit in units],
+                       dtype=np.float64)
+        self.rebuild(pos, faction, health, dps)
+        self.propagate()
+        return True
+
+    def rebuild(self, pos: np.ndarray, faction: np.ndarray,
+                health: np.ndarray, dps: np.ndarray) -> None:
+        x = np.clip((pos[:, 0] // self.cell_size.x).astype(np.int64),
+                    0, self.shape[0] - 1)
+        y = np.clip((pos[:, 1] // self.cell_size.y).astype(np.int64),
+                    0, self.shape[1] - 1)
+        self.strength[:] = 0
+        self.dps[:] = 0
+        np.add.at(self.strength, (faction, x, y), health)
+        np.add.at(self.dps, (faction, x, y), dps)
+
+    def neighbours(self, grid: np.ndarray) -> np.ndarray:
+        # the largest of the four neighbouring cells, per faction
+        out = np.zeros_like(grid)
+        np.maximum(out[:, 1:, :], grid[:, :-1, :], out=out[:, 1:, :])
+        np.maximum(out[:, :-1, :], grid[:, 1:, :], out=out[:, :-1, :])
+        np.maximum(out[:, :, 1:], grid[:, :, :-1], out=out[:, :, 1:])
+        np.maximum(out[:, :, :-1], grid[:, :, 1:], out=out[:, :, :-1])
+        return out
+
+    def propagate(self) -> None:
+        # the dps every faction faces is everyone's dps minus its own
+        threat = self.dps.sum(axis=0) - self.dps
+        frontier = threat
+        for _ in range(self.spread):
+            frontier = self.neighbours(frontier) * self.falloff
+            np.maximum(threat, frontier, out=threat)
+        np.maximum(threat, self.threat * self.memory, out=self.threat)
+
+    def strength_at(self, faction: int, pos: Vector2) -> float:
+        return float(self.strength[(faction,) + self.to_cell(pos)])
+
+    def dps_at(self, faction: int, pos: Vector2) -> float:
+        return float(self.dps[(faction,) + self.to_cell(pos)])
+
+    def threat_at(self, faction: int, pos: Vector2) -> float:
+        return float(self.threat[(faction,) + self.to_cell(pos)])
+
+    def cell_center(self, cell: Tuple[int, int]) -> Vector2:
+        return Vector2((cell[0] + 0.5) * self.cell_size.x,
+                       (cell[1] + 0.5) * self.cell_size.y)
+
+    def safest(self, faction: int) -> Vector2:
+        cell = np.unravel_index(np.argmin(self.threat[faction]), self.shape)
+        return self.cell_center(cell)
+
+    def attack_target(self, faction: int) -> Vector2:
+        # the most enemy strength for the least threat to us, or None
+        enemies = self.strength.sum(axis=0) - self.strength[faction]
+        if not enemies.any():
+            return None
+        score = enemies / (1 + self.threat[faction])
+        cell = np.unravel_index(np.argmax(score), self.shape)
+        return self.cell_center(cell)
@@ -0,0 +1,194 @@
+import math
+
+import numpy as np
+
+
+# The kernels below are plain loops over struct-of-arrays unit data. They are
+# written in the subset of Python that Numba compiles, so the reference
+# backend and the JIT backend run the exact same source.
+
+
+def build_cells(pos: np.ndarray, cell_size: float, cols: int, rows: int):
+    # counting-sort style cell list: the units of cell c are
+    # order[start[c]:start[c + 1]]
+    cx = np.clip((pos[:, 0] // cell_size).astype(np.int64), 0, cols - 1)
+    cy = np.clip((pos[:, 1] // cell_size).astype(np.int64), 0, rows - 1)
+    keys = cx * rows + cy
+    order = np.argsort(keys, kind='stable')
+    start = np.searchsorted(keys[order], np.arange(cols * rows + 1))
+    return order, start
+
+
+def cell_list(pos: np.ndarray, cell_size: float, size) -> tuple:
+    # the cell arguments of the neighbour kernels for a world of the given
+    # size, in kernel argument order: order, start, cols, rows, cell_size
+    cols = int(size[0] // cell_size) + 1
+    rows = int(size[1] // cell_size) + 1
+    return (*build_cells(pos, cell_size, cols, rows), cols, rows, cell_size)
+
+
+def separation(pos, size, order, start, cols, rows, cell_size, strength, out):
+    for i in range(pos.shape[0]):
+        px = pos[i, 0]
+        py = pos[i, 1]
+        radius = size[i]
+        x0 = max(int((px - radius) // cell_size), 0)
+        x1 = min(int((px + radius) // cell_size), cols - 1)
+        y0 = max(int((py - radius) // cell_size), 0)
+        y1 = min(int((py + radius) // cell_size), rows - 1)
+        fx = 0.0
+        fy = 0.0
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cx * rows + cy
+                for k in range(start[cell], start[cell + 1]):
+                    j = order[k]
+                    if j == i:
+                        continue
+                    dx = px - pos[j, 0]
+                    dy = py - pos[j, 1]
+                    distance = math.sqrt(dx * dx + dy * dy)
+                    if distance >= radius:
+                        continue
+                    if distance > 0:
+                        dx /= distance
+                        dy /= distance
+                    else:
+                        # stacked units, split them by index instead of at
+                        # random so both backends agree
+                        dx = 1.0 if i > j else -1.0
+                        dy = 0.0
+                    scale = strength / max(distance, 1.0)
+                    fx += dx * scale
+                    fy += dy * scale
+        out[i, 0] = fx
+        out[i, 1] = fy
+
+
+def nearest_enemy(pos, faction, reach, order, start, cols, rows, cell_size, out):
+    for i in range(pos.shape[0]):
+        px = pos[i, 0]
+        py = pos[i, 1]
+        radius = reach[i]
+        x0 = max(int((px - radius) // cell_size), 0)
+        x1 = min(int((px + radius) // cell_size), cols - 1)
+        y0 = max(int((py - radius) // cell_size), 0)
+        y1 = min(int((py + radius) // cell_size), rows - 1)
+        best = -1
+        best_sq = radius * radius
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cx * rows + cy
+                for k in range(start[cell], start[cell + 1]):
+                    j = order[k]
+                    if j == i or faction[j] == faction[i]:
+                        continue
+                    dx = pos[j, 0] - px
+                    dy = pos[j, 1] - py
+                    distance_sq = dx * dx + dy * dy
+                    if distance_sq < best_sq or (best == -1 and distance_sq <= best_sq):
+                        best = j
+                        best_sq = distance_sq
+        out[i] = best
+
+
+def seek(pos, vel, target, max_speed, arrive_radius, out):
+    for i in range(pos.shape[0]):
+        dx = target[i, 0] - pos[i, 0]
+        dy = target[i, 1] - pos[i, 1]
+        distance = math.sqrt(dx * dx + dy * dy)
+        if distance == 0:
+            out[i, 0] = 0.0
+            out[i, 1] = 0.0
+            continue
+        speed = max_speed[i]
+        if distance < arrive_radius[i]:
+            speed = (distance / arrive_radius[i]) * speed
+        out[i, 0] = dx / distance * speed - vel[i, 0]
+        out[i, 1] = dy / distance * speed - vel[i, 1]
+
+
+class Backend:
+    def __init__(self, name: str, jit) -> None:
+        self.name = name
+        self.separation = jit(separation)
+        self.nearest_enemy = jit(nearest_enemy)
+        self.seek = jit(seek)
+
+
+python_backend = Backend('python', lambda kernel: kernel)
+numba_backend = None
+
+
+def load_numba() -> Backend:
+    # numba takes a noticeable part of a second to import, so it is only
+    # pulled in when a caller actually asks for the JIT backend
+    global numba_backend
+    if numba_backend is None:
+        try:
+            import numba
+        except ImportError:
+            return None
+        # cache=True keeps the compiled kernels on disk between runs
+        numba_backend = Backend('numba', numba.njit(cache=True))
+    return numba_backend
+
+
+def check_parity(count: int = 2000, seed: int = 0, size: float = 240) -> list:
+    # returns the names of the kernels whose backends disagree
+    numba_backend = load_numba()
+    if numba_backend is None:
+        raise RuntimeError('numba is not installed, nothing to compare')
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(0, size, (count, 2))
+    # an exactly stacked pair exercises the zero-distance branch
+    pos[1] = pos[0]
+    vel = rng.uniform(-50, 50, (count, 2))
+    target = rng.uniform(0, size, (count, 2))
+    unit_size = np.full(count, 2.0)
+    reach = np.full(count, 30.0)
+    max_speed = np.full(count, 50.0)
+    arrive_radius = np.full(count, 10.0)
+    faction = rng.integers(0, 4, count)
+    strength = rng.uniform(1, 5)
+
+    # the same cell sizes the game index uses
+    fine = cell_list(pos, size / 60, (size, size))
+    coarse = cell_list(pos, size / 8, (size, size))
+    results = []
+    for kernels in (python_backend, numba_backend):
+        forces = np.zeros((count, 2))
+        enemies = np.zeros(count, dtype=np.int64)
+        steering = np.zeros((count, 2))
+        kernels.separation(pos, unit_size, *fine, strength, forces)
+        kernels.nearest_enemy(pos, faction, reach, *coarse, enemies)
+        kernels.seek(pos, vel, target, max_speed, arrive_radius, steering)
+        results.append((forces, enemies, steering))
+    return [name for name, a, b
+            in zip(('separation', 'nearest_enemy', 'seek'), *results)
+            if not np.array_equal(a, b)]
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(
+        description='check that the python and numba kernels agree')
+    parser.add_argument('--count', type=int, default=2000)
+    parser.add_argument('--seeds', type=int, default=3)
+    parser.add_argument('--require-numba', action='store_true',
+                        help='fail instead of skipping without numba')
+    args = parser.parse_args()
+
+    if load_numba() is None:
+        print('numba is not installed, parity check skipped')
+        sys.exit(1 if args.require_numba else 0)
+    failed = False
+    for seed in range(args.seeds):
+        for name in check_parity(args.count, seed):
+            print(f'seed {seed}: {name} differs between backends')
+            failed = True
+    if failed:
+        sys.exit(1)
+    print(f'python and numba kernels agree over {args.seeds} seeds')
@@ -0,0 +1,115 @@
+from typing import Tuple
+
+import numpy as np
+from pygame import Vector2
+
+
+class DistanceField:
+    def __init__(self, size: Vector2, cell_size: float = 1,
+                 max_distance: float = 8) -> None:
+        self.cell_size = cell_size
+        # distances are clamped, so an obstacle only ever touches the cells
+        # within max_distance of it and rebuilds can stay local
+        self.max_distance = max_distance
+        # samples sit on cell corners and are indexed [x, y] like surfarray
+        self.shape = (int(size.x // cell_size) + 1, int(size.y // cell_size) + 1)
+        self.dist = np.full(self.shape, max_distance, dtype=np.float32)
+        self.grad = np.zeros(self.shape + (2,), dtype=np.float32)
+        self.obstacles = []
+
+    def rect(self, obstacle) -> Tuple[float, float, float, float]:
+        return (obstacle.pos.x, obstacle.pos.y,
+                obstacle.pos.x + obstacle.size, obstacle.pos.y + obstacle.size)
+
+    def region(self, rect: Tuple[float, float, float, float],
+               margin: float) -> Tuple[int, int, int, int]:
+        x0, y0, x1, y1 = rect
+        return (max(int((x0 - margin) // self.cell_size), 0),
+                max(int((y0 - margin) // self.cell_size), 0),
+                min(int((x1 + margin) // self.cell_size) + 2, self.shape[0]),
+                min(int((y1 + margin) // self.cell_size) + 2, self.shape[1]))
+
+    def add(self, obstacle) -> None:
+        self.obstacles.append(obstacle)
+        self.rebuild(self.rect(obstacle))
+
+    def remove(self, obstacle) -> None:
+        self.obstacles.remove(obstacle)
+        self.rebuild(self.rect(obstacle))
+
+    def rebuild(self, rect: Tuple[float, float, float, float]) -> None:
+        x0, y0, x1, y1 = self.region(rect, self.max_distance + self.cell_size)
+        if x0 >= x1 or y0 >= y1:
+            return
+        xs = (np.arange(x0, x1, dtype=np.float32) * self.cell_size)[:, None]
+        ys = (np.arange(y0, y1, dtype=np.float32) * self.cell_size)[None, :]
+        dist = np.full((x1 - x0, y1 - y0), self.max_distance, dtype=np.float32)
+        for obstacle in self.obstacles:
+            ox0, oy0, ox1, oy1 = self.region(self.rect(obstacle),
+                                             self.max_distance)
+            if ox1 <= x0 or ox0 >= x1 or oy1 <= y0 or oy0 >= y1:
+                continue
+            np.minimum(dist, self.box_distance(xs, ys, self.rect(obstacle)),
+                       out=dist)
+        self.dist[x0:x1, y0:y1] = np.minimum(dist, self.max_distance)
+        self.rebuild_gradient(x0, y0, x1, y1)
+
+    def box_distance(self, xs: np.ndarray, ys: np.ndarray,
+                     rect: Tuple[float, float, float, float]) -> np.ndarray:
+        x0, y0, x1, y1 = rect
+        dx = np.abs(xs - (x0 + x1) / 2) - (x1 - x0) / 2
+        dy = np.abs(ys - (y0 + y1) / 2) - (y1 - y0) / 2
+        outside = np.hypot(np.maximum(dx, 0), np.maximum(dy, 0))
+        inside = np.minimum(np.maximum(dx, dy), 0)
+        return outside + inside
+
+    def rebuild_gradient(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        # differentiate a slightly larger window so the cells we write back
+        # never use the one-sided differences at the window edge
+        wx0, wy0 = max(x0 - 2, 0), max(y0 - 2, 0)
+        wx1, wy1 = min(x1 + 2, self.shape[0]), min(y1 + 2, self.shape[1])
+        if wx1 - wx0 < 2 or wy1 - wy0 < 2:
+            return
+        gx, gy = np.gradient(self.dist[wx0:wx1, wy0:wy1], self.cell_size)
+        ix0, iy0 = max(x0 - 1, 0), max(y0 - 1, 0)
+        ix1, iy1 = min(x1 + 1, self.shape[0]), min(y1 + 1, self.shape[1])
+        self.grad[ix0:ix1, iy0:iy1, 0] = gx[ix0 - wx0:ix1 - wx0, iy0 - wy0:iy1 - wy0]
+        self.grad[ix0:ix1, iy0:iy1, 1] = gy[ix0 - wx0:ix1 - wx0, iy0 - wy0:iy1 - wy0]
+
+    def sample(self, pos: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # bilinear lookup of distance and gradient for an (n, 2) array
+        f = pos / self.cell_size
+        i = np.clip(np.floor(f).astype(np.int32), 0,
+                    np.array(self.shape) - 2)
+        t = np.clip(f - i, 0, 1)
+        tx, ty = t[:, 0], t[:, 1]
+        x, y = i[:, 0], i[:, 1]
+        w00 = (1 - tx) * (1 - ty)
+        w10 = tx * (1 - ty)
+        w01 = (1 - tx) * ty
+        w11 = tx * ty
+        dist = (self.dist[x, y] * w00 + self.dist[x + 1, y] * w10
+                + self.dist[x, y + 1] * w01 + self.dist[x + 1, y + 1] * w11)
+        grad = (self.grad[x, y] * w00[:, None] + self.grad[x + 1, y] * w10[:, None]
+                + self.grad[x, y + 1] * w01[:, None]
+                + self.grad[x + 1, y + 1] * w11[:, None])
+        return dist, grad
+
+    def resolve(self, units: list) -> None:
+        if not self.obstacles or not units:
+            return
+        pos = np.array([(unit.pos.x, unit.pos.y) for unit in units],
+                       dtype=np.float32)
+        radius = np.array([unit.size / 2 for unit in units], dtype=np.float32)
+        dist, grad = self.sample(pos)
+        for i in np.flatnonzero(dist < radius):
+            normal = Vector2(float(grad[i, 0]), float(grad[i, 1]))
+            if normal.length_squared() == 0:
+                continue
+            normal.normalize_ip()
+            unit = units[i]
+            unit.pos += normal * float(radius[i] - dist[i])
+            # drop the part of the velocity that points into the obstacle
+            into = unit.vel.dot(normal)
+            if into < 0:
+                unit.vel -= normal * into
@@ -0,0 +1,104 @@
+import random
+
+import numpy as np
+import pygame
+from pygame import Surface, Vector2
+
+
+class ProjectilePool:
+    def __init__(self, capacity: int = 4096) -> None:
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        # position at the start of the last tick, for render interpolation
+        self.prev_pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.ttl = np.zeros(capacity, dtype=np.float32)
+        self.damage = np.zeros(capacity, dtype=np.float32)
+        self.radius = np.zeros(capacity, dtype=np.float32)
+        self.splash = np.zeros(capacity, dtype=bool)
+        self.faction = np.zeros(capacity, dtype=np.int32)
+        self.active = np.zeros(capacity, dtype=bool)
+        # attackers are only needed for take_damage, kept out of the arrays
+        self.owners = [None] * capacity
+        # stack of free slot indices, the top is free[free_count - 1]
+        self.free = np.arange(capacity - 1, -1, -1, dtype=np.int32)
+        self.free_count = capacity
+
+    def __len__(self) -> int:
+        return self.capacity - self.free_count
+
+    def spawn(self, owner, target, speed: float, damage: float,
+              spread: float = 0, splash: float = 0) -> bool:
+        if self.free_count == 0:
+            return False
+        self.free_count -= 1
+        i = self.free[self.free_count]
+
+        origin = owner.pos
+        distance = origin.distance_to(target.pos)
+        flight = distance / speed
+        # lead the target, then scatter the aim point so shots can miss
+        aim = target.pos + target.vel * flight
+        aim.x += random.uniform(-spread, spread)
+        aim.y += random.uniform(-spread, spread)
+        flight = max(origin.distance_to(aim) / speed, 1e-3)
+
+        self.pos[i] = origin.x, origin.y
+        self.prev_pos[i] = self.pos[i]
+        self.vel[i] = (aim.x - origin.x) / flight, (aim.y - origin.y) / flight
+        self.ttl[i] = flight
+        self.damage[i] = damage
+        self.radius[i] = splash or target.size
+        self.splash[i] = splash > 0
+        self.faction[i] = owner.faction
+        self.owners[i] = owner
+        self.active[i] = True
+        return True
+
+    def update(self, dt: float, index) -> None:
+        if self.free_count == self.capacity:
+            return
+        active = self.active
+        self.prev_pos[active] = self.pos[active]
+        self.pos[active] += self.vel[active] * dt
+        self.ttl[active] -= dt
+        impacts = np.flatnonzero(active & (self.ttl <= 0))
+        for i in impacts:
+            self.impact(i, index)
+        # recycle the expired slots
+        count = len(impacts)
+        self.active[impacts] = False
+        self.free[self.free_count:self.free_count + count] = impacts
+        self.free_count += count
+
+    def impact(self, i: int, index) -> None:
+        pos = Vector2(float(self.pos[i, 0]), float(self.pos[i, 1]))
+        faction = self.faction[i]
+        owner = self.owners[i]
+        self.owners[i] = None
+        hits = [unit for unit in index.query_circle(pos, float(self.radius[i]))
+                if unit.alive and unit.faction != faction]
+        if not hits:
+            return
+        if not self.splash[i]:
+            hits = [min(hits, key=lambda unit: pos.distance_squared_to(unit.pos))]
+        damage = float(self.damage[i])
+        for unit in hits:
+            unit.take_damage(damage, owner)
+
+    def draw(self, surface: Surface, alpha: float = 1,
+             color=(255, 220, 120)) -> None:
+        if self.free_count == self.capacity:
+            return
+        width, height = surface.get_size()
+        pos = self.pos[self.active]
+        if alpha < 1:
+            prev_pos = self.prev_pos[self.active]
+            pos = prev_pos + (pos - prev_pos) * alpha
+        pos = pos.astype(np.int32)
+        inside = ((pos[:, 0] >= 0) & (pos[:, 0] < width)
+                  & (pos[:, 1] >= 0) & (pos[:, 1] < height))
+        pos = pos[inside]
+        array = pygame.surfarray.pixels3d(surface)
+        array[pos[:, 0], pos[:, 1]] = color
+        del array
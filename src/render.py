@@ -0,0 +1,116 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pygame
+from pygame import Rect, Surface, Vector2
+
+from src.util import faction_colors
+
+NORMAL = 0
+SELECTED = 1
+DAMAGED = 2
+STATES = (NORMAL, SELECTED, DAMAGED)
+
+
+class SpriteAtlas:
+    def __init__(self, size: int, faction: int) -> None:
+        self.size = size
+        self.faction = faction
+        # every frame is large enough for the selection ring, so all states
+        # share the same offset from the unit position
+        self.frame = (size + 2) * 2
+        self.offset = Vector2(self.frame, self.frame) / 2
+        self.surface = Surface((self.frame * len(STATES), self.frame),
+                               pygame.SRCALPHA)
+        self.areas = [Rect(state * self.frame, 0, self.frame, self.frame)
+                      for state in STATES]
+        self.render()
+
+    def color(self, state: int) -> Tuple[int, int, int]:
+        color = faction_colors.get(self.faction, (255, 255, 255))
+        if state == DAMAGED:
+            return tuple(int(c * 0.6) for c in color)
+        return color
+
+    def render(self) -> None:
+        center = self.offset
+        radius = max(self.size // 2, 1)
+        for state, area in zip(STATES, self.areas):
+            frame = self.surface.subsurface(area)
+            if state == SELECTED:
+                pygame.draw.circle(frame, (0, 200, 0, 100), center,
+                                   self.size + 2, 1)
+            pygame.draw.circle(frame, self.color(state), center, radius)
+
+    def stamp(self) -> List[Tuple[int, int]]:
+        # pixel offsets covered by the unit body, used by the surfarray path
+        frame = self.surface.subsurface(self.areas[NORMAL])
+        alpha = pygame.surfarray.array_alpha(frame)
+        xs, ys = np.nonzero(alpha)
+        return [(int(x - self.offset.x), int(y - self.offset.y))
+                for x, y in zip(xs, ys)]
+
+
+class UnitRenderer:
+    def __init__(self, mode: str = 'auto', tiny_size: int = 2) -> None:
+        # 'blits' draws every unit from the atlas, 'surfarray' writes tiny
+        # units straight into the pixel array, 'auto' picks per unit
+        self.mode = mode
+        self.tiny_size = tiny_size
+        self.atlases: Dict[Tuple[int, int], SpriteAtlas] = {}
+        self.stamps: Dict[Tuple[int, int], list] = {}
+
+    def atlas(self, size: int, faction: int) -> SpriteAtlas:
+        key = (size, faction)
+        if key not in self.atlases:
+            self.atlases[key] = SpriteAtlas(size, faction)
+        return self.atlases[key]
+
+    def state(self, unit, selected: set) -> int:
+        if unit in selected:
+            return SELECTED
+        if unit.health < unit.max_health / 2:
+            return DAMAGED
+        return NORMAL
+
+    def draw(self, surface: Surface, units: list, selected_units: list,
+             alpha: float = 1) -> None:
+        selected = set(selected_units)
+        batch = []
+        pixels = {}
+        for unit in units:
+            state = self.state(unit, selected)
+            pos = unit.draw_pos(alpha)
+            if (self.mode == 'surfarray' or self.mode == 'auto'
+                    and unit.size <= self.tiny_size) and state != SELECTED:
+                key = (unit.size, unit.faction, state)
+                if key not in pixels:
+                    pixels[key] = ([], [])
+                xs, ys = pixels[key]
+                xs.append(pos.x)
+                ys.append(pos.y)
+            else:
+                atlas = self.atlas(unit.size, unit.faction)
+                batch.append((atlas.surface, pos - atlas.offset,
+                              atlas.areas[state]))
+        if pixels:
+            self.draw_pixels(surface, pixels)
+        surface.blits(batch, doreturn=False)
+
+    def draw_pixels(self, surface: Surface, pixels: dict) -> None:
+        width, height = surface.get_size()
+        array = pygame.surfarray.pixels3d(surface)
+        for (size, faction, state), (pos_x, pos_y) in pixels.items():
+            atlas = self.atlas(size, faction)
+            key = (size, faction)
+            if key not in self.stamps:
+                self.stamps[key] = atlas.stamp()
+            pos_x = np.array(pos_x).astype(np.int32)
+            pos_y = np.array(pos_y).astype(np.int32)
+            color = atlas.color(state)
+            for dx, dy in self.stamps[key]:
+                xs = pos_x + dx
+                ys = pos_y + dy
+                inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+                array[xs[inside], ys[inside]] = color
+        del array
@@ -0,0 +1,144 @@
+from typing import List
+
+import pygame
+from pygame import Vector2
+
+
+class Grid:
+    def __init__(self, size: Vector2, cell_size: Vector2):
+        self.size = size
+        self.cell_size = cell_size
+        self.cells = {}
+        self.clear()
+
+    def clear(self):
+        # cells are created on demand, empty ones never exist
+        self.cells = {}
+
+    def to_key(self, pos: Vector2):
+        return (int(pos.x//self.cell_size.x), int(pos.y//self.cell_size.y))
+
+    def add(self, obj: object):
+        key = self.to_key(obj.pos)
+        self.cells.setdefault(key, []).append(obj)
+
+    def add_all(self, objs: list):
+        for obj in objs:
+            self.add(obj)
+
+    def query_circle(self, pos: Vector2, radius: float) -> list:
+        objs = []
+        start_x = int((pos.x - radius)//self.cell_size.x)
+        start_y = int((pos.y - radius)//self.cell_size.y)
+        end_x = int((pos.x + radius)//self.cell_size.x)
+        end_y = int((pos.y + radius)//self.cell_size.y)
+        for x in range(start_x, end_x+1):
+            for y in range(start_y, end_y+1):
+                objs.extend(self.cells.get((x, y), []))
+        return objs
+
+    def query_rect(self, rect: pygame.Rect, margin: float = 0) -> list:
+        objs = []
+        start_x = int((rect.left - margin)//self.cell_size.x)
+        start_y = int((rect.top - margin)//self.cell_size.y)
+        end_x = int((rect.right + margin)//self.cell_size.x)
+        end_y = int((rect.bottom + margin)//self.cell_size.y)
+        for x in range(start_x, end_x+1):
+            for y in range(start_y, end_y+1):
+                objs.extend(self.cells.get((x, y), []))
+        return objs
+
+    # draw each cell as a rectangle
+    def draw(self, surf: pygame.Surface):
+        for x in range(int(self.size.x//self.cell_size.x)):
+            for y in range(int(self.size.y//self.cell_size.y)):
+                pygame.draw.rect(surf, (0, 0, 0, 10),
+                                 (x*self.cell_size.x, y*self.cell_size.y,
+                                  self.cell_size.x, self.cell_size.y), 1)
+
+
+class QueryStats:
+    def __init__(self) -> None:
+        self.queries = 0
+        self.examined = 0
+        self.returned = 0
+
+    @property
+    def overfetch(self) -> float:
+        return self.examined / max(self.returned, 1)
+
+    def __repr__(self) -> str:
+        return (f'QueryStats(queries={self.queries}, examined={self.examined}, '
+                f'returned={self.returned}, overfetch={self.overfetch:.1f})')
+
+
+class SpatialIndex:
+    def __init__(self, size: Vector2, cell_sizes: List[Vector2]):
+        self.size = size
+        self.levels = [Grid(size, Vector2(cell_size))
+                       for cell_size in sorted(cell_sizes, key=lambda c: c.x)]
+        # levels are filled lazily on their first query, so a level nobody
+        # queries this tick costs nothing; built[i] is how many of objs
+        # level i already holds
+        self.objs = []
+        self.built = [0] * len(self.levels)
+        # stats add up across clears until reset_stats() is called
+        self.stats = [QueryStats() for _ in self.levels]
+
+    def clear(self):
+        self.objs = []
+        self.built = [0] * len(self.levels)
+        for grid in self.levels:
+            grid.clear()
+
+    def reset_stats(self):
+        self.stats = [QueryStats() for _ in self.levels]
+
+    def add(self, obj: object):
+        self.objs.append(obj)
+
+    def add_all(self, objs: list):
+        self.objs.extend(objs)
+
+    def level(self, i: int) -> Grid:
+        grid = self.levels[i]
+        built = self.built[i]
+        if built < len(self.objs):
+            grid.add_all(self.objs[built:])
+            self.built[i] = len(self.objs)
+        return grid
+
+    def level_for(self, radius: float) -> int:
+        # the finest level whose cells cover the radius scans the fewest
+        # irrelevant objects; larger queries fall through to the coarsest
+        for i, grid in enumerate(self.levels):
+            if min(grid.cell_size.x, grid.cell_size.y) >= radius:
+                return i
+        return len(self.levels) - 1
+
+    def query_circle(self, pos: Vector2, radius: float) -> list:
+        level = self.level_for(radius)
+        candidates = self.level(level).query_circle(pos, radius)
+        radius_sq = radius * radius
+        objs = [obj for obj in candidates
+                if pos.distance_squared_to(obj.pos) <= radius_sq]
+        stats = self.stats[level]
+        stats.queries += 1
+        stats.examined += len(candidates)
+        stats.returned += len(objs)
+        return objs
+
+    def query_rect(self, rect: pygame.Rect, margin: float = 0) -> list:
+        # objects are bucketed where they stood when the level was built,
+        # margin widens the cell range for anything that moved since
+        level = len(self.levels) - 1
+        candidates = self.level(level).query_rect(rect, margin)
+        objs = [obj for obj in candidates if rect.collidepoint(obj.pos)]
+        stats = self.stats[level]
+        stats.queries += 1
+        stats.examined += len(candidates)
+        stats.returned += len(objs)
+        return objs
+
+    def draw(self, surf: pygame.Surface):
+        self.levels[-1].draw(surf)
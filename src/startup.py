@@ -0,0 +1,57 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# runs in a fresh interpreter so nothing is already imported or cached
+probe = '''
+import json, sys, time
+start = time.perf_counter()
+from pygame import Vector2
+import src
+from src.unit import Infantry
+imported = time.perf_counter()
+game = src.Game(headless=sys.argv[1] == 'headless',
+                kernels=sys.argv[2] if len(sys.argv) > 2 else None)
+created = time.perf_counter()
+game.spawn(Infantry, 100, Vector2(120, 120), 0)
+game.update(game.timestep.step)
+ticked = time.perf_counter()
+print(json.dumps({'import': imported - start, 'game': created - imported,
+                  'first_tick': ticked - created, 'total': ticked - start}))
+'''
+
+
+def measure(runs: int = 5, headless: bool = True, kernels: str = None) -> dict:
+    env = dict(os.environ)
+    env.setdefault('SDL_VIDEODRIVER', 'dummy')
+    env.setdefault('SDL_AUDIODRIVER', 'dummy')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [root, env.get('PYTHONPATH')]))
+    samples = []
+    for _ in range(runs):
+        command = [sys.executable, '-c', probe,
+                   'headless' if headless else 'window']
+        if kernels is not None:
+            command.append(kernels)
+        output = subprocess.run(command, env=env, capture_output=True,
+                                text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: statistics.median(sample[key] for sample in samples)
+            for key in samples[0]}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='measure import-to-first-tick latency')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--window', action='store_true')
+    parser.add_argument('--kernels', choices=['numba', 'auto'], default=None)
+    args = parser.parse_args()
+
+    for key, value in measure(args.runs, not args.window, args.kernels).items():
+        print(f'{key:>10}: {value*1000:8.1f} ms')
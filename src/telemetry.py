@@ -0,0 +1,150 @@
+import threading
+import zipfile
+from typing import Dict
+
+import numpy as np
+
+SHOT = 0
+DAMAGE = 1
+KILL = 2
+REMOVED = 3
+
+columns = {
+    'time': np.float32,
+    'kind': np.uint8,
+    'faction': np.int8,
+    'other': np.int8,
+    'value': np.float32,
+    'x': np.float32,
+    'y': np.float32,
+}
+
+
+class Telemetry:
+    def __init__(self, path: str = None, factions: int = 7,
+                 capacity: int = 1 << 16, batch: int = 1 << 13,
+                 flush_interval: float = 1, dps_window: float = 2) -> None:
+        # one preallocated array per column, used as a ring buffer; head is
+        # the total number of events ever recorded, flushed how many of
+        # them reached the file
+        self.capacity = capacity
+        self.buffer = {name: np.zeros(capacity, dtype=dtype)
+                       for name, dtype in columns.items()}
+        self.head = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.time = 0
+
+        self.shots = np.zeros(factions, dtype=np.int64)
+        self.damage = np.zeros(factions, dtype=np.float64)
+        self.kills = np.zeros(factions, dtype=np.int64)
+        self.dps = np.zeros(factions, dtype=np.float64)
+        self.tick_damage = np.zeros(factions, dtype=np.float64)
+        self.dps_window = dps_window
+
+        self.path = path
+        self.batch = batch
+        self.flush_interval = flush_interval
+        self.archive = None
+        self.batches = 0
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.writer = None
+        if path is not None:
+            self.archive = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)
+            self.writer = threading.Thread(target=self.run, daemon=True)
+            self.writer.start()
+
+    # === HOT PATH ===
+
+    def record(self, kind: int, faction: int, other: int, value: float,
+               pos) -> None:
+        i = self.head % self.capacity
+        buffer = self.buffer
+        buffer['time'][i] = self.time
+        buffer['kind'][i] = kind
+        buffer['faction'][i] = faction
+        buffer['other'][i] = other
+        buffer['value'][i] = value
+        buffer['x'][i] = pos.x
+        buffer['y'][i] = pos.y
+        self.head += 1
+        if self.writer is not None and self.head - self.flushed >= self.batch:
+            self.wake.set()
+
+    def shot(self, owner, target, damage: float) -> None:
+        self.shots[owner.faction] += 1
+        self.record(SHOT, owner.faction, target.faction, damage, owner.pos)
+
+    def hit(self, unit, attacker, damage: float, killed: bool) -> None:
+        faction = attacker.faction if attacker is not None else -1
+        if faction >= 0:
+            self.damage[faction] += damage
+            self.tick_damage[faction] += damage
+        self.record(DAMAGE, faction, unit.faction, damage, unit.pos)
+        if killed:
+            if faction >= 0:
+                self.kills[faction] += 1
+            self.record(KILL, faction, unit.faction, 0, unit.pos)
+
+    def removed(self, unit) -> None:
+        self.record(REMOVED, unit.faction, -1, 0, unit.pos)
+
+    def tick(self, dt: float) -> None:
+        self.time += dt
+        # exponential moving average of the damage per second
+        weight = min(dt / self.dps_window, 1)
+        self.dps *= 1 - weight
+        self.dps += self.tick_damage / dt * weight
+        self.tick_damage[:] = 0
+
+    # === WRITER ===
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        head = self.head
+        if head - self.flushed > self.capacity:
+            # the hot path lapped the writer, the oldest events are gone
+            self.dropped += head - self.flushed - self.capacity
+            self.flushed = head - self.capacity
+        count = head - self.flushed
+        if count == 0 or self.archive is None:
+            return
+        indices = np.arange(self.flushed, head) % self.capacity
+        for name, array in self.buffer.items():
+            with self.archive.open(f'{self.batches:06d}/{name}.npy', 'w') as f:
+                np.lib.format.write_array(f, array[indices])
+        self.batches += 1
+        self.flushed = head
+
+    def close(self) -> None:
+        if self.writer is None:
+            return
+        self.stopped.set()
+        self.wake.set()
+        self.writer.join()
+        self.writer = None
+        self.flush()
+        self.archive.close()
+        self.archive = None
+
+    def summary(self) -> Dict[str, np.ndarray]:
+        return {'shots': self.shots.copy(), 'damage': self.damage.copy(),
+                'kills': self.kills.copy(), 'dps': self.dps.copy()}
+
+
+def load(path: str) -> Dict[str, np.ndarray]:
+    with zipfile.ZipFile(path) as archive:
+        chunks = {name: [] for name in columns}
+        for entry in sorted(archive.namelist()):
+            name = entry.split('/')[-1][:-len('.npy')]
+            with archive.open(entry) as f:
+                chunks[name].append(np.lib.format.read_array(f))
+    return {name: np.concatenate(parts) if parts
+            else np.zeros(0, dtype=columns[name])
+            for name, parts in chunks.items()}
@@ -0,0 +1,38 @@
+class FixedTimestep:
+    policies = ('skip', 'slow')
+
+    def __init__(self, rate: int = 60, policy: str = 'skip',
+                 max_frame_skip: int = 5) -> None:
+        if policy not in self.policies:
+            raise ValueError(f'unknown overload policy: {policy}')
+        self.step = 1 / rate
+        # 'skip' runs up to max_frame_skip ticks per rendered frame to keep
+        # real time, 'slow' runs one tick per frame and lets the simulation
+        # fall behind the wall clock instead
+        self.policy = policy
+        self.max_frame_skip = max_frame_skip
+        self.accumulator = 0
+        self.dropped = 0
+
+    @property
+    def max_ticks(self) -> int:
+        return self.max_frame_skip if self.policy == 'skip' else 1
+
+    @property
+    def alpha(self) -> float:
+        # how far the renderer is between the last two simulated states
+        return min(self.accumulator / self.step, 1)
+
+    def advance(self, dt: float) -> int:
+        self.accumulator += dt
+        ticks = int(self.accumulator // self.step)
+        if ticks > self.max_ticks:
+            # whatever can't be simulated this frame is discarded so an
+            # overloaded frame doesn't make the next one even longer
+            self.dropped += ticks - self.max_ticks
+            ticks = self.max_ticks
+            self.accumulator = min(self.accumulator - ticks * self.step,
+                                   self.step)
+        else:
+            self.accumulator -= ticks * self.step
+        return ticks
@@ -0,0 +1,122 @@
+import random
+from multiprocessing import Pool
+from typing import Dict, Iterable, List
+
+import numpy as np
+from pygame import Vector2
+
+from src import Game
+from src.unit import Infantry
+
+columns = ('battle', 'seed', 'faction', 'corner', 'spawned', 'survivors',
+           'won', 'decided', 'time')
+
+
+class FactionConfig:
+    def __init__(self, count: int = 50, unit_stats: Dict[str, float] = None,
+                 weapon_stats: Dict[str, float] = None) -> None:
+        self.count = count
+        # e.g. {'max_speed': 40} and {'range': 25, 'damage': 12, 'cooldown': .4}
+        self.unit_stats = unit_stats or {}
+        self.weapon_stats = weapon_stats or {}
+
+
+class BattleConfig:
+    def __init__(self, battle: int, seed: int, factions: List[FactionConfig],
+                 max_time: float = 120, dt: float = 1/60,
+                 kernels: str = None) -> None:
+        self.battle = battle
+        self.seed = seed
+        self.factions = factions
+        self.max_time = max_time
+        self.dt = dt
+        # see Game, 'auto' uses the numba kernels when they are installed
+        self.kernels = kernels
+
+
+def spawn_points(game: Game) -> List[Vector2]:
+    # the same corners the spawn keys use
+    size = game.screen_size
+    return [Vector2(60, 60), Vector2(size.x - 60, 60),
+            Vector2(size.x - 60, size.y - 60), Vector2(60, size.y - 60)]
+
+
+def run_battle(config: BattleConfig) -> List[tuple]:
+    random.seed(config.seed)
+    game = Game(headless=True, kernels=config.kernels)
+    points = spawn_points(game)
+    center = game.screen_size / 2
+    # the corner and the place in the update order both favour a faction,
+    # so both are drawn from the seed instead of following the faction index
+    order = list(range(len(points)))
+    random.shuffle(order)
+    corners = [order[faction % len(points)]
+               for faction in range(len(config.factions))]
+    for faction, faction_config in enumerate(config.factions):
+        jitter = Vector2(random.uniform(-10, 10), random.uniform(-10, 10))
+        units = game.spawn(Infantry, faction_config.count,
+                           points[corners[faction]] + jitter, faction,
+                           target=center)
+        for unit in units:
+            for key, value in faction_config.unit_stats.items():
+                setattr(unit, key, value)
+            for key, value in faction_config.weapon_stats.items():
+                setattr(unit.weapon, key, value)
+    random.shuffle(game.units)
+
+    time = 0
+    alive = set(range(len(config.factions)))
+    while time < config.max_time and len(alive) > 1:
+        game.update(config.dt)
+        time += config.dt
+        alive = {unit.faction for unit in game.units}
+
+    survivors = [0] * len(config.factions)
+    for unit in game.units:
+        survivors[unit.faction] += 1
+    decided = len(alive) <= 1
+    return [(config.battle, config.seed, faction, corners[faction],
+             faction_config.count, survivors[faction],
+             decided and faction in alive, decided, time)
+            for faction, faction_config in enumerate(config.factions)]
+
+
+def run_tournament(configs: Iterable[BattleConfig], path: str,
+                   processes: int = None) -> Dict[str, np.ndarray]:
+    with Pool(processes) as pool:
+        rows = [row for battle in pool.imap_unordered(run_battle, configs)
+                for row in battle]
+        pool.close()
+        pool.join()
+    rows.sort()
+    results = {name: np.array(values)
+               for name, values in zip(columns, zip(*rows))}
+    np.savez_compressed(path, **results)
+    return results
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='run headless battles')
+    parser.add_argument('--battles', type=int, default=100)
+    parser.add_argument('--factions', type=int, default=2)
+    parser.add_argument('--units', type=int, default=50)
+    parser.add_argument('--max-time', type=float, default=120)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--kernels', choices=['numba', 'auto'], default=None)
+    parser.add_argument('--out', default='tournament.npz')
+    args = parser.parse_args()
+
+    configs = [BattleConfig(battle, seed=battle,
+                            factions=[FactionConfig(args.units)
+                                      for _ in range(args.factions)],
+                            max_time=args.max_time, kernels=args.kernels)
+               for battle in range(args.battles)]
+    run_tournament(configs, args.out, args.processes)
+
+
+if __name__ == '__main__':
+    # go through the package module so workers can unpickle the configs
+    from src.tournament import main
+    main()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import random
+from collections import deque
 from typing import Any, Tuple
 from typing import List
 
@@ -9,10 +10,14 @@ from pygame import Vector2
 
 from src.util import faction_colors
 
+# how hard overlapping units push apart, shared with the separation kernel
+separation_strength = 3
+
 
 class Unit:
     def __init__(self, pos: Vector2, size: int, health: int, max_force: float, max_speed: float, faction: int):
         self.pos = Vector2(pos)
+        self.prev_pos = Vector2(pos)
         self.vel = Vector2()
         self.acc = Vector2()
         self.size = size
@@ -24,36 +29,57 @@ class Unit:
         self.faction = faction
 
         self.move_target = None
+        # shift-queued targets, taken in order as each one is reached
+        self.waypoints = deque()
         self.attack_target = None
 
         self.weapon = None
 
+        self.telemetry = None
+
     @property
     def alive(self):
         return self.health > 0
 
-    def update(self, dt):
+    def update(self, dt, steer: bool = True):
+        # steer=False when the seek force was already added by the kernels
+        self.prev_pos = Vector2(self.pos)
         self.weapon.update(dt)
         if self.attack_target is not None:
             self.weapon.fire(self.attack_target)
             if not self.attack_target.alive:
                 self.attack_target = None
-        if self.move_target is not None:
-            if (self.move_target - self.pos).length() <= self.size:
-                self.vel = Vector2()
-                self.move_target = None
-            else:
-                self.acc += self.seek(self.move_target)
+        if steer and self.arrive():
+            self.acc += self.seek(self.move_target)
         self.vel += self.acc
         self.pos += self.vel * dt
         self.vel *= 0.9
         self.acc = Vector2()
 
+    def draw_pos(self, alpha: float = 1) -> Vector2:
+        # position between the last two simulation ticks, used for drawing
+        if alpha >= 1:
+            return self.pos
+        return self.prev_pos.lerp(self.pos, alpha)
+
     def draw(self, surface, color: Tuple[int, int, int] = (255, 255, 255)):
         pygame.draw.circle(surface, color, self.pos, self.size//2)
 
     # === MOVEMENT ===
 
+    def arrive(self) -> bool:
+        # moves on to the next waypoint or stops at the target, returns
+        # whether there is still a target to seek
+        if self.move_target is None:
+            return False
+        if (self.move_target - self.pos).length() <= self.size:
+            if not self.waypoints:
+                self.vel = Vector2()
+                self.move_target = None
+                return False
+            self.move_target = self.waypoints.popleft()
+        return True
+
     def seek(self, target: Vector2, arrive_radius: int = 0):
         distance = (target - self.pos).length()
         if distance == 0:
@@ -76,13 +102,20 @@ class Unit:
                     force.normalize_ip()
                 else:
                     force = Vector2(random.random()-0.5, random.random()-0.5)
-                force *= 3
+                force *= separation_strength
                 force *= 1 / max(distance, 1)
                 summed += force
         self.acc += summed
 
     def set_move_target(self, target):
         self.move_target = target
+        self.waypoints.clear()
+
+    def add_move_target(self, target):
+        if self.move_target is None:
+            self.move_target = target
+        else:
+            self.waypoints.append(target)
 
     def restrict_to_surface(self, surf: pygame.Surface):
         size = surf.get_size()
@@ -118,20 +151,25 @@ class Unit:
             self.attack_target = closest
 
     def take_damage(self, damage: int, attacker: Any):
+        alive = self.alive
         self.health -= damage
+        if self.telemetry is not None:
+            self.telemetry.hit(self, attacker, damage, alive and not self.alive)
 
 
 class Infantry(Unit):
     def __init__(self, pos: Vector2, faction: int):
         super().__init__(pos, size=2, health=100, max_force=1, max_speed=50, faction=faction)
-        self.weapon = Weapon(owner=self, range=30, damage=10, cooldown=0.5)
+        self.weapon = Weapon(owner=self, range=30, damage=10, cooldown=0.5,
+                             speed=150, spread=1.5)
 
     def draw(self, surface):
         return super().draw(surface, faction_colors[self.faction])
 
 
 class Weapon:
-    def __init__(self, owner: Unit, range: int, damage: int, cooldown: float):
+    def __init__(self, owner: Unit, range: int, damage: int, cooldown: float,
+                 speed: float = 0, spread: float = 0, splash: float = 0):
         self.owner = owner
         self.range = range
         self.damage = damage
@@ -139,6 +177,12 @@ class Weapon:
         self.ready = True
         self.cooldown_timer = 0
 
+        # a speed of 0, or no pool to fire into, hits instantly
+        self.speed = speed
+        self.spread = spread
+        self.splash = splash
+        self.projectiles = None
+
     def update(self, dt):
         if self.ready:
             return
@@ -149,5 +193,11 @@ class Weapon:
 
     def fire(self, target: Any):
         if self.ready:
-            target.take_damage(self.damage, self.owner)
+            if self.owner.telemetry is not None:
+                self.owner.telemetry.shot(self.owner, target, self.damage)
+            if not (self.speed and self.projectiles is not None
+                    and self.projectiles.spawn(self.owner, target, self.speed,
+                                               self.damage, self.spread,
+                                               self.splash)):
+                target.take_damage(self.damage, self.owner)
             self.ready = False
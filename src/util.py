@@ -1,4 +1,5 @@
-from typing import Tuple
+import math
+from typing import List, Tuple
 import pygame
 from pygame import Vector2, Surface
 
@@ -23,6 +24,22 @@ def map_range(x, a, b, c, d):
     return (x - a) / (b - a) * (d - c) + c
 
 
+def spiral_positions(center: Vector2, count: int, spacing: float) -> List[Vector2]:
+    # sunflower spiral, evenly packs points around the center
+    golden_angle = math.pi * (3 - math.sqrt(5))
+    positions = []
+    for i in range(count):
+        radius = spacing * math.sqrt(i) / 2
+        angle = i * golden_angle
+        positions.append(center + Vector2(math.cos(angle), math.sin(angle)) * radius)
+    return positions
+
+
+def spiral_radius(count: int, spacing: float) -> float:
+    # distance of the outermost point spiral_positions places
+    return spacing * math.sqrt(max(count - 1, 0)) / 2
+
+
 def circle_collide_rect(c_pos, radius, r_pos, r_size):
     test = Vector2()
     if c_pos.x < r_pos.x: